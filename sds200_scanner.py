@@ -2,21 +2,48 @@
 """
 SDS200 Scanner Data Collector
 Pulls data from Uniden SDS200 scanner via network and provides API for web dashboard
+
+Usage: sds200_scanner.py [IP[:PORT] ...]
+An IPv6 address with a port is written [IP]:PORT. With more than one address every scanner is polled from one event loop and
+saved to its own data file.
 """
 
+import asyncio
 import socket
 import json
+import os
+import struct
+import sys
 import time
 import threading
-from datetime import datetime
+from array import array
+from collections import deque
+from multiprocessing import resource_tracker, shared_memory
 from pathlib import Path
 import logging
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 # Configuration
 SCANNER_IP = "192.168.2.251"
 SCANNER_PORT = 10001
 SOCKET_TIMEOUT = 5
+RECV_BUFFER_SIZE = 4096
+KEEPALIVE_IDLE = 30
+KEEPALIVE_INTERVAL = 10
+RECONNECT_DELAY = 5
+RECONNECT_MAX_DELAY = 60
+HISTORY_SIZE = 4096
+SLOW_POLL_INTERVAL = 10
+MAX_DATA_AGE = 1
 DATA_FILE = "/tmp/sds200_data.json"
+SHM_NAME = "sds200"
+SHM_SIZE = 65536
+SHM_HEARTBEAT_INTERVAL = 1
+SHM_STALE_AFTER = 5
 LOG_FILE = "/tmp/sds200_scanner.log"
 
 # Setup logging
@@ -30,11 +57,233 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Scanner commands, pre-encoded with their terminating carriage return
+CMD_BYTES = {
+    'MDL': b'MDL\r',
+    'VER': b'VER\r',
+    'STS': b'STS\r',
+}
+
+def _parse_mdl(parts):
+    return parts[1]
+
+def _parse_ver(parts):
+    return parts[1]
+
+_STS_PADDING = [None] * 6
+
+def _parse_sts(parts):
+    # STS response format: STS,FREQUENCY,SIGNAL_STRENGTH,MODE,VOLUME,SQUELCH
+    # Pad short replies once instead of bounds-checking every field
+    if len(parts) < 6:
+        parts = parts + _STS_PADDING[len(parts):]
+    return {
+        'frequency': parts[1],
+        'signal_strength': parts[2],
+        'mode': parts[3],
+        'volume': parts[4],
+        'squelch': parts[5],
+    }
+
+# Commands sent on every poll
+POLL_COMMANDS = ('MDL', 'VER', 'STS')
+
+PARSERS = {
+    'MDL': _parse_mdl,
+    'VER': _parse_ver,
+    'STS': _parse_sts,
+}
+
+if orjson is not None:
+    json_dumps = orjson.dumps
+else:
+    def json_dumps(obj):
+        """Serialize obj to compact JSON bytes"""
+        return json.dumps(obj, separators=(',', ':')).encode()
+
+# Shared memory layout: version, payload length, heartbeat, then the JSON
+# payload. The version is odd while the collector is writing. The heartbeat
+# is the wall-clock time the collector last marked itself alive, or 0 once
+# it has shut down
+SHM_HEADER = struct.Struct('<QQd')
+SHM_HEARTBEAT = struct.Struct('<d')
+SHM_HEARTBEAT_OFFSET = 16
+SHM_READ_RETRIES = 100
+
+def attach_shared_memory(create=False, name=SHM_NAME):
+    """Attach to the collector's shared memory segment, or None if it doesn't exist"""
+    try:
+        shm = shared_memory.SharedMemory(name=name, create=create, size=SHM_SIZE)
+    except FileExistsError:
+        shm = shared_memory.SharedMemory(name=name)
+    except FileNotFoundError:
+        return None
+    # The segment outlives any one process, like the data file; stop the
+    # resource tracker from unlinking it when this process exits
+    resource_tracker.unregister(shm._name, 'shared_memory')
+    return shm
+
+def shared_memory_live(shm):
+    """Check whether the collector publishing to shm is still running"""
+    heartbeat = SHM_HEARTBEAT.unpack_from(shm.buf, SHM_HEARTBEAT_OFFSET)[0]
+    return time.time() - heartbeat <= SHM_STALE_AFTER
+
+def read_shared_json(shm):
+    """Read the latest JSON bytes published to shm, or None if there are none
+    
+    Data from a collector that stopped or stopped heartbeating is not returned.
+    """
+    buf = shm.buf
+    if not shared_memory_live(shm):
+        return None
+    for _ in range(SHM_READ_RETRIES):
+        version, length, _ = SHM_HEADER.unpack_from(buf, 0)
+        if version == 0:
+            return None
+        if version % 2 == 0:
+            payload = bytes(buf[SHM_HEADER.size:SHM_HEADER.size + length])
+            # Only accept the copy if no write started while it was taken
+            if SHM_HEADER.unpack_from(buf, 0)[0] == version:
+                return payload
+    return None
+
+# Stored in the integer history arrays when a field is missing, unparseable
+# or out of range for its column
+MISSING = -1
+INT16_MAX = 2 ** 15 - 1
+INT64_MAX = 2 ** 63 - 1
+
+def _parse_int(value):
+    """Convert a signal strength for the int16 history column"""
+    try:
+        n = int(value)
+    except (TypeError, ValueError):
+        return MISSING
+    return n if -INT16_MAX <= n <= INT16_MAX else MISSING
+
+def _parse_freq(value):
+    """Convert an STS frequency in MHz to integer Hz for the int64 history column"""
+    try:
+        hz = round(float(value) * 1000000)
+    except (TypeError, ValueError, OverflowError):
+        return MISSING
+    return hz if -INT64_MAX <= hz <= INT64_MAX else MISSING
+
+def _or_none(value):
+    return None if value == MISSING else value
+
+def bucket_signal(rssi, ts, nbuckets):
+    """Split samples into nbuckets equal time spans and return mean, min and max lists"""
+    sums = [0] * nbuckets
+    counts = [0] * nbuckets
+    mins = [None] * nbuckets
+    maxs = [None] * nbuckets
+    if ts:
+        # Timestamps are wall-clock and can step backwards, so take the
+        # range from the extremes rather than the first and last samples
+        t0 = min(ts)
+        span = max(ts) - t0 + 1
+        for t, v in zip(ts, rssi):
+            if v == MISSING:
+                continue
+            b = (t - t0) * nbuckets // span
+            sums[b] += v
+            counts[b] += 1
+            if mins[b] is None or v < mins[b]:
+                mins[b] = v
+            if maxs[b] is None or v > maxs[b]:
+                maxs[b] = v
+    means = [s / c if c else None for s, c in zip(sums, counts)]
+    return means, mins, maxs
+
+class _ScannerProtocol(asyncio.BufferedProtocol):
+    """Receives scanner replies into a reused buffer and splits them on CR"""
+    
+    def __init__(self):
+        self._buf = bytearray(RECV_BUFFER_SIZE)
+        self._view = memoryview(self._buf)
+        self._fill = 0
+        self._frames = deque()
+        self._waiter = None
+        self._closed = False
+    
+    def get_buffer(self, sizehint):
+        if self._fill == len(self._buf):
+            # A single frame filled the whole buffer; make room for the rest of it
+            self._view.release()
+            self._buf = self._buf + bytearray(len(self._buf))
+            self._view = memoryview(self._buf)
+        return self._view[self._fill:]
+    
+    def buffer_updated(self, nbytes):
+        start = 0
+        end = self._fill + nbytes
+        idx = self._buf.find(b'\r', self._fill, end)
+        while idx >= 0:
+            self._frames.append(self._buf[start:idx])
+            start = idx + 1
+            idx = self._buf.find(b'\r', start, end)
+        # Move any partial frame to the front of the buffer
+        self._fill = end - start
+        if start:
+            self._view[:self._fill] = self._view[start:end]
+        if self._frames:
+            self._wake()
+    
+    def connection_lost(self, exc):
+        self._closed = True
+        self._wake()
+    
+    def _wake(self):
+        if self._waiter is not None and not self._waiter.done():
+            self._waiter.set_result(None)
+    
+    async def read_frame(self):
+        """Wait for the next complete frame, without its CR"""
+        while not self._frames:
+            if self._closed:
+                raise ConnectionError("Scanner closed the connection")
+            self._waiter = asyncio.get_running_loop().create_future()
+            try:
+                await self._waiter
+            finally:
+                self._waiter = None
+        return self._frames.popleft()
+    
+    def discard_frames(self):
+        """Drop every frame received but not yet read, returning how many"""
+        count = len(self._frames)
+        self._frames.clear()
+        return count
+
 class SDS200Scanner:
-    def __init__(self, ip, port):
+    def __init__(self, ip, port, data_file=DATA_FILE):
         self.ip = ip
         self.port = port
-        self.socket = None
+        self.data_file = data_file
+        self.transport = None
+        self.protocol = None
+        self._backoff = RECONNECT_DELAY
+        self._last_hash = None
+        self._cached_json = None
+        self._shm = None
+        # Set by refresh() to wake continuous_scan before its interval is up;
+        # only exists while a scan loop is running
+        self._refresh = None
+        self._poll_waiter = None
+        self._last_poll = 0.0
+        self._ts_second = 0
+        self._ts_str = ""
+        # Ring of the last HISTORY_SIZE STS samples, one array per field.
+        # _history_head counts every sample ever appended and doubles as the
+        # sequence number of the newest one
+        self._hist_ts = array('q', [0]) * HISTORY_SIZE
+        self._hist_freq = array('q', [0]) * HISTORY_SIZE
+        self._hist_rssi = array('h', [0]) * HISTORY_SIZE
+        self._hist_mode = [None] * HISTORY_SIZE
+        self._history_head = 0
+        self._history_lock = threading.Lock()
+        self._bucket_cache = (None, None)
         self.scanner_data = {
             "timestamp": None,
             "connected": False,
@@ -50,12 +299,15 @@ class SDS200Scanner:
             "all_responses": {}
         }
     
-    def connect(self):
+    async def connect(self):
         """Connect to the SDS200 scanner"""
         try:
-            self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            self.socket.settimeout(SOCKET_TIMEOUT)
-            self.socket.connect((self.ip, self.port))
+            loop = asyncio.get_running_loop()
+            self.transport, self.protocol = await asyncio.wait_for(
+                loop.create_connection(_ScannerProtocol, self.ip, self.port), SOCKET_TIMEOUT
+            )
+            self._configure_socket(self.transport.get_extra_info('socket'))
+            self._backoff = RECONNECT_DELAY
             self.scanner_data["connected"] = True
             self.scanner_data["error"] = None
             logger.info(f"Connected to SDS200 at {self.ip}:{self.port}")
@@ -66,153 +318,481 @@ class SDS200Scanner:
             logger.error(f"Failed to connect to SDS200: {e}")
             return False
     
+    def _configure_socket(self, sock):
+        """Tune the scanner socket for a long-lived, low-latency connection"""
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+        # Keepalive tuning knobs are Linux-specific
+        if hasattr(socket, 'TCP_KEEPIDLE'):
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, KEEPALIVE_IDLE)
+        if hasattr(socket, 'TCP_KEEPINTVL'):
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPINTVL, KEEPALIVE_INTERVAL)
+    
+    async def _reconnect_backoff(self):
+        """Wait before the next connection attempt, doubling the delay each time"""
+        logger.info(f"Reconnecting in {self._backoff}s")
+        await asyncio.sleep(self._backoff)
+        self._backoff = min(self._backoff * 2, RECONNECT_MAX_DELAY)
+    
     def disconnect(self):
         """Disconnect from the SDS200 scanner"""
         try:
-            if self.socket:
-                self.socket.close()
+            if self.transport:
+                self.transport.close()
+                self.transport = None
+                self.protocol = None
                 self.scanner_data["connected"] = False
                 logger.info("Disconnected from SDS200")
         except Exception as e:
             logger.error(f"Error disconnecting: {e}")
     
-    def send_command(self, command):
+    async def send_command(self, command):
         """Send a command to the scanner and receive response"""
         try:
-            # Add carriage return if not present
-            if not command.endswith('\r'):
-                command += '\r'
+            data = CMD_BYTES.get(command)
+            if data is None:
+                # Add carriage return if not present
+                if not command.endswith('\r'):
+                    command += '\r'
+                data = command.encode()
             
-            self.socket.sendall(command.encode())
-            response = self.socket.recv(4096).decode().strip()
-            return response
-        except socket.timeout:
+            self._discard_stale()
+            self.transport.write(data)
+            return await self._read_reply(command.rstrip('\r'))
+        except asyncio.TimeoutError:
             logger.warning(f"Socket timeout for command: {command}")
             return None
         except Exception as e:
             logger.error(f"Error sending command {command}: {e}")
             return None
     
+    async def send_commands(self, commands):
+        """Send several commands in one write and return their responses by command
+        
+        Unlike send_command, errors are raised to the caller.
+        """
+        self._discard_stale()
+        self.transport.write(b''.join(CMD_BYTES[cmd] for cmd in commands))
+        return {cmd: await self._read_reply(cmd) for cmd in commands}
+    
+    def _discard_stale(self):
+        """Drop replies left over from a timed-out batch before sending the next one"""
+        dropped = self.protocol.discard_frames()
+        if dropped:
+            logger.debug(f"Discarded {dropped} stale responses")
+    
+    async def _read_frame(self):
+        """Read one CR-terminated frame from the scanner"""
+        frame = await asyncio.wait_for(self.protocol.read_frame(), SOCKET_TIMEOUT)
+        return frame.decode('ascii', errors='replace').strip()
+    
+    async def _read_reply(self, command_type):
+        """Read the reply to command_type, skipping late replies to earlier commands"""
+        while True:
+            response = await self._read_frame()
+            tag = response.partition(',')[0]
+            # After a read timeout the connection is kept, so replies that
+            # arrived too late for the previous poll may still be queued
+            if tag == command_type or tag not in CMD_BYTES:
+                return response
+            logger.debug(f"Discarding stale response: {response}")
+    
     def parse_response(self, response, command_type):
         """Parse scanner responses and extract data"""
         if not response:
             return None
         
+        parser = PARSERS.get(command_type)
+        if parser is None:
+            return response
+        
         try:
-            parts = response.split(',')
-            
-            if command_type == 'MDL' and len(parts) >= 2:
-                return parts[1]
-            elif command_type == 'VER' and len(parts) >= 2:
-                return parts[1]
-            elif command_type == 'STS' and len(parts) >= 2:
-                # STS response format: STS,FREQUENCY,SIGNAL_STRENGTH,MODE,VOLUME,SQUELCH
-                return {
-                    'frequency': parts[1] if len(parts) > 1 else None,
-                    'signal_strength': parts[2] if len(parts) > 2 else None,
-                    'mode': parts[3] if len(parts) > 3 else None,
-                    'volume': parts[4] if len(parts) > 4 else None,
-                    'squelch': parts[5] if len(parts) > 5 else None,
-                }
-            else:
+            # No field past SQUELCH is used, so don't split the rest of the line
+            parts = response.split(',', 6)
+            if len(parts) < 2:
                 return response
+            return parser(parts)
         except Exception as e:
             logger.error(f"Error parsing response: {e}")
             return response
     
-    def get_model(self):
-        """Get scanner model"""
-        response = self.send_command('MDL')
-        if response:
+    def _dispatch(self, command_type, response):
+        """Store a scanner response in scanner_data"""
+        if not response:
+            return
+        
+        if command_type == 'MDL':
             self.scanner_data["model"] = self.parse_response(response, 'MDL')
-            self.scanner_data["all_responses"]["MDL"] = response
-    
-    def get_firmware(self):
-        """Get firmware version"""
-        response = self.send_command('VER')
-        if response:
+        elif command_type == 'VER':
             self.scanner_data["firmware"] = self.parse_response(response, 'VER')
-            self.scanner_data["all_responses"]["VER"] = response
-    
-    def get_status(self):
-        """Get current scanner status"""
-        response = self.send_command('STS')
-        if response:
+        elif command_type == 'STS':
             status = self.parse_response(response, 'STS')
             if isinstance(status, dict):
                 self.scanner_data.update(status)
+                self._record_history(status)
             self.scanner_data["status"] = response
-            self.scanner_data["all_responses"]["STS"] = response
+        self.scanner_data["all_responses"][command_type] = response
+    
+    def _record_history(self, status):
+        """Append an STS sample to the history ring"""
+        ts = int(time.time())
+        freq = _parse_freq(status['frequency'])
+        rssi = _parse_int(status['signal_strength'])
+        with self._history_lock:
+            idx = self._history_head % HISTORY_SIZE
+            self._hist_ts[idx] = ts
+            self._hist_freq[idx] = freq
+            self._hist_rssi[idx] = rssi
+            self._hist_mode[idx] = status['mode']
+            self._history_head += 1
+    
+    def _history_slice(self, column, since):
+        """Copy the entries of a history column newer than since, oldest first"""
+        head = self._history_head
+        # Never reach back past the first sample, even for a negative since
+        count = min(max(head - since, 0), head, HISTORY_SIZE)
+        start = (head - count) % HISTORY_SIZE
+        end = head % HISTORY_SIZE
+        if count == 0:
+            return column[:0]
+        if start < end:
+            return column[start:end]
+        # The window wraps around the end of the ring
+        return column[start:] + column[:end]
+    
+    def get_history(self, since=0):
+        """Get the newest sequence number and the samples recorded after since"""
+        with self._history_lock:
+            seq = self._history_head
+            columns = [self._history_slice(c, since) for c in
+                       (self._hist_ts, self._hist_freq, self._hist_rssi, self._hist_mode)]
+        samples = [
+            (ts, _or_none(freq), _or_none(rssi), mode)
+            for ts, freq, rssi, mode in zip(*columns)
+        ]
+        return seq, samples
     
-    def pull_all_data(self):
+    def downsample_history(self, k, since=0):
+        """Get the newest sequence number and mean signal strength per k samples"""
+        with self._history_lock:
+            seq = self._history_head
+            rssi = self._history_slice(self._hist_rssi, since)
+        means = []
+        for i in range(0, len(rssi) - len(rssi) % k, k):
+            bucket = [v for v in rssi[i:i + k] if v != MISSING]
+            means.append(sum(bucket) / len(bucket) if bucket else None)
+        return seq, means
+    
+    def bucket_history(self, nbuckets, since=0):
+        """Get signal strength mean/min/max over nbuckets time buckets
+        
+        Returns a dict with the newest sequence number, the first and last
+        sample timestamps and the per-bucket lists. The result is reused
+        until a new sample arrives.
+        """
+        with self._history_lock:
+            key = (self._history_head, since, nbuckets)
+            cached_key, cached = self._bucket_cache
+            if cached_key == key:
+                return cached
+            ts = self._history_slice(self._hist_ts, since)
+            rssi = self._history_slice(self._hist_rssi, since)
+        means, mins, maxs = bucket_signal(rssi, ts, nbuckets)
+        result = {
+            "seq": key[0],
+            "start": min(ts) if ts else None,
+            "end": max(ts) if ts else None,
+            "mean": means,
+            "min": mins,
+            "max": maxs,
+        }
+        self._bucket_cache = (key, result)
+        return result
+    
+    async def get_model(self):
+        """Get scanner model"""
+        self._dispatch('MDL', await self.send_command('MDL'))
+    
+    async def get_firmware(self):
+        """Get firmware version"""
+        self._dispatch('VER', await self.send_command('VER'))
+    
+    async def get_status(self):
+        """Get current scanner status"""
+        self._dispatch('STS', await self.send_command('STS'))
+    
+    async def pull_all_data(self):
         """Pull all data from scanner"""
-        self.scanner_data["timestamp"] = datetime.now().isoformat()
+        # Only reformat the timestamp when the wall-clock second changes
+        now = int(time.time())
+        if now != self._ts_second:
+            self._ts_str = time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(now))
+            self._ts_second = now
+        self.scanner_data["timestamp"] = self._ts_str
         
         if not self.scanner_data["connected"]:
-            if not self.connect():
+            if not await self.connect():
                 return False
         
         try:
-            self.get_model()
-            self.get_firmware()
-            self.get_status()
+            # One write and one round trip per poll instead of one per command
+            responses = await self.send_commands(POLL_COMMANDS)
+            self.scanner_data["error"] = None
+            for cmd, response in responses.items():
+                self._dispatch(cmd, response)
             return True
+        except asyncio.TimeoutError:
+            # A slow reply is not a dead link - keep the connection for the next poll
+            logger.warning("Timeout waiting for scanner response")
+            self.scanner_data["error"] = "Timeout waiting for scanner response"
+            return False
+        except (ConnectionError, OSError) as e:
+            logger.error(f"Connection to SDS200 lost: {e}")
+            self.scanner_data["error"] = str(e)
+            self.disconnect()
+            return False
         except Exception as e:
             logger.error(f"Error pulling data: {e}")
             self.scanner_data["error"] = str(e)
             return False
     
     def save_to_file(self):
-        """Save scanner data to JSON file"""
+        """Save scanner data to JSON file, skipping the write if nothing changed
+        
+        The cached JSON is refreshed on every poll. The poll timestamp alone
+        changing does not count for the file, so its timestamp is the time
+        the data last changed.
+        """
         try:
-            with open(DATA_FILE, 'w') as f:
-                json.dump(self.scanner_data, f, indent=2)
-            logger.debug(f"Data saved to {DATA_FILE}")
+            self.update_cached_json()
+            state = {k: v for k, v in self.scanner_data.items() if k != "timestamp"}
+            h = hash(json_dumps(state))
+            if h == self._last_hash:
+                return
+            payload = self._cached_json
+            if self._shm is not None:
+                self._publish_shared(payload)
+            
+            # Write to a temp file and rename so readers never see a partial file
+            tmp = self.data_file + '.tmp'
+            with open(tmp, 'wb') as f:
+                f.write(payload)
+            os.replace(tmp, self.data_file)
+            self._last_hash = h
+            logger.debug(f"Data saved to {self.data_file}")
         except Exception as e:
             logger.error(f"Error saving data to file: {e}")
     
+    def open_shared_memory(self, name=SHM_NAME):
+        """Also publish scanner data to the named shared memory segment"""
+        self._shm = attach_shared_memory(create=True, name=name)
+    
+    def _publish_shared(self, payload):
+        """Copy payload into shared memory, bumping the version around the write"""
+        buf = self._shm.buf
+        end = SHM_HEADER.size + len(payload)
+        if end > len(buf):
+            logger.warning(f"Scanner data ({len(payload)} bytes) too large for shared memory")
+            return
+        version = SHM_HEADER.unpack_from(buf, 0)[0] | 1
+        SHM_HEADER.pack_into(buf, 0, version, len(payload), time.time())
+        buf[SHM_HEADER.size:end] = payload
+        SHM_HEADER.pack_into(buf, 0, version + 1, len(payload), time.time())
+    
+    async def heartbeat_shared_memory(self, interval=SHM_HEARTBEAT_INTERVAL):
+        """Keep marking the shared memory segment live until cancelled"""
+        while True:
+            SHM_HEARTBEAT.pack_into(self._shm.buf, SHM_HEARTBEAT_OFFSET, time.time())
+            await asyncio.sleep(interval)
+    
+    def close_shared_memory(self):
+        """Mark the shared memory segment as no longer published and detach from it"""
+        if self._shm is not None:
+            SHM_HEARTBEAT.pack_into(self._shm.buf, SHM_HEARTBEAT_OFFSET, 0.0)
+            self._shm.close()
+            self._shm = None
+    
     def get_data(self):
         """Get current scanner data"""
         return self.scanner_data
-
-def continuous_scan(scanner, interval=1):
-    """Continuously scan the scanner at specified interval"""
-    logger.info(f"Starting continuous scan with {interval}s interval")
     
-    while True:
+    def get_cached_json(self):
+        """Get the last serialized scanner data as JSON bytes"""
+        return self._cached_json
+    
+    def update_cached_json(self):
+        """Re-serialize scanner data in memory without saving it"""
+        self._cached_json = json_dumps(self.scanner_data)
+    
+    def _poll_finished(self):
+        """Record a completed poll and wake requests waiting for fresh data"""
+        self._last_poll = time.monotonic()
+        if self._poll_waiter is not None and not self._poll_waiter.done():
+            self._poll_waiter.set_result(None)
+        self._poll_waiter = None
+    
+    async def refresh(self, max_age=MAX_DATA_AGE):
+        """Get the scanner data as JSON bytes, polling first if it is older than max_age"""
+        # While disconnected, the scan loop is backing off and won't poll on
+        # request, so serve the last data rather than waiting for it
+        if (self._refresh is not None and self.scanner_data["connected"]
+                and time.monotonic() - self._last_poll > max_age):
+            # Concurrent requests share one waiter, and so one poll
+            if self._poll_waiter is None:
+                self._poll_waiter = asyncio.get_running_loop().create_future()
+            waiter = self._poll_waiter
+            self._refresh.set()
+            await asyncio.wait([waiter], timeout=SOCKET_TIMEOUT)
+        return self.get_cached_json()
+    
+    async def continuous_scan_async(self, interval=1):
+        """Continuously scan the scanner at specified interval, or sooner on refresh()"""
+        logger.info(f"Starting continuous scan with {interval}s interval")
+        
+        self._refresh = asyncio.Event()
         try:
-            if not scanner.scanner_data["connected"]:
-                scanner.connect()
-            
-            scanner.pull_all_data()
-            scanner.save_to_file()
-            
-            time.sleep(interval)
-        except KeyboardInterrupt:
-            logger.info("Scan interrupted by user")
-            break
-        except Exception as e:
-            logger.error(f"Error in continuous scan: {e}")
-            scanner.disconnect()
-            time.sleep(5)  # Wait before reconnecting
+            while True:
+                try:
+                    if not self.scanner_data["connected"] and not await self.connect():
+                        self.save_to_file()
+                        self._poll_finished()
+                        self._refresh.clear()
+                        await self._reconnect_backoff()
+                        continue
+        
+                    await self.pull_all_data()
+                    self.save_to_file()
+                    self._poll_finished()
+                    # Requests made during the poll were answered by it
+                    self._refresh.clear()
+        
+                    try:
+                        await asyncio.wait_for(self._refresh.wait(), interval)
+                    except asyncio.TimeoutError:
+                        pass
+                except asyncio.CancelledError:
+                    logger.info("Scan cancelled")
+                    raise
+                except Exception as e:
+                    logger.error(f"Error in continuous scan: {e}")
+                    await asyncio.sleep(interval)
+        finally:
+            self._refresh = None
 
-def main():
-    """Main function"""
-    scanner = SDS200Scanner(SCANNER_IP, SCANNER_PORT)
+def data_file_for(ip, port):
+    """Get a data file path specific to one scanner, derived from DATA_FILE"""
+    base, ext = os.path.splitext(DATA_FILE)
+    return f"{base}_{ip.replace(':', '_')}_{port}{ext}"
+
+class ScannerPool:
+    """Drives any number of scanners from a single event loop
     
-    # Start continuous scanning in background thread
-    scan_thread = threading.Thread(target=continuous_scan, args=(scanner, 1), daemon=True)
-    scan_thread.start()
+    The loop's selector (epoll on Linux) waits on every scanner connection
+    at once, so adding a scanner adds a task rather than a thread.
+    """
     
-    logger.info("SDS200 Scanner Data Collector started")
+    def __init__(self, scanners=()):
+        self.scanners = []
+        for scanner in scanners:
+            self.add(scanner)
+    
+    def add(self, scanner):
+        """Add a scanner to be polled by run()
+        
+        A scanner whose data file is already used by another one in the pool
+        is moved to a file named after its address.
+        """
+        for other in self.scanners:
+            if (other.ip, other.port) == (scanner.ip, scanner.port):
+                raise ValueError(f"Scanner {scanner.ip}:{scanner.port} is already in the pool")
+        if any(other.data_file == scanner.data_file for other in self.scanners):
+            scanner.data_file = data_file_for(scanner.ip, scanner.port)
+            if any(other.data_file == scanner.data_file for other in self.scanners):
+                raise ValueError(f"Data file {scanner.data_file} is already in use")
+        self.scanners.append(scanner)
     
-    # Keep main thread alive
+    async def _run_scanner(self, scanner, interval, delay):
+        await asyncio.sleep(delay)
+        await scanner.continuous_scan_async(interval)
+    
+    async def run(self, interval=1):
+        """Poll all scanners until cancelled, spreading their polls across the interval"""
+        if not self.scanners:
+            return
+        step = interval / len(self.scanners)
+        tasks = [
+            asyncio.create_task(self._run_scanner(scanner, interval, i * step))
+            for i, scanner in enumerate(self.scanners)
+        ]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            for scanner in self.scanners:
+                scanner.disconnect()
+
+USAGE = "Usage: sds200_scanner.py [IP[:PORT] ...]"
+
+def parse_address(text):
+    """Split an IP[:PORT] or [IPv6]:PORT argument, defaulting to SCANNER_PORT
+    
+    Raises ValueError if the address or port is malformed.
+    """
+    if text.startswith('['):
+        ip, sep, rest = text[1:].partition(']')
+        if not sep or not ip or (rest and not rest.startswith(':')):
+            raise ValueError(f"bad address {text!r}")
+        port = rest[1:] if rest else None
+    elif text.count(':') > 1:
+        # A bare IPv6 address; its port must be given as [IP]:PORT
+        ip, port = text, None
+    else:
+        ip, sep, port = text.partition(':')
+        if not sep:
+            port = None
+    if not ip:
+        raise ValueError(f"bad address {text!r}")
+    if port is None:
+        return ip, SCANNER_PORT
+    if not port.isdigit() or not 0 < int(port) < 65536:
+        raise ValueError(f"bad port in {text!r}")
+    return ip, int(port)
+
+async def main_pool(addresses):
+    """Poll several scanners, each saving to its own data file"""
+    pool = ScannerPool(SDS200Scanner(ip, port, data_file_for(ip, port)) for ip, port in addresses)
+    logger.info(f"SDS200 Scanner Data Collector started for {len(addresses)} scanners")
+    await pool.run(1)
+
+async def main_async(ip=SCANNER_IP, port=SCANNER_PORT):
+    """Run the collector on a single event loop"""
+    scanner = SDS200Scanner(ip, port)
+    scanner.open_shared_memory()
+    logger.info("SDS200 Scanner Data Collector started")
     try:
-        while True:
-            time.sleep(1)
+        await asyncio.gather(
+            scanner.continuous_scan_async(1),
+            scanner.heartbeat_shared_memory(),
+        )
+    finally:
+        scanner.disconnect()
+        scanner.close_shared_memory()
+
+def main():
+    """Main function"""
+    try:
+        addresses = [parse_address(arg) for arg in sys.argv[1:]]
+    except ValueError as e:
+        sys.exit(f"{e}\n{USAGE}")
+    try:
+        if len(addresses) > 1:
+            asyncio.run(main_pool(addresses))
+        else:
+            asyncio.run(main_async(*(addresses[0] if addresses else ())))
     except KeyboardInterrupt:
         logger.info("Shutting down...")
-        scanner.disconnect()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
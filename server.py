@@ -1,20 +1,160 @@
 #!/usr/bin/env python3
-import subprocess
-import json
+import asyncio
+import gzip
 import os
-from http.server import HTTPServer, SimpleHTTPRequestHandler
+import stat
+import threading
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
 
-scanner_process = None
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+from sds200_scanner import (
+    SDS200Scanner, SCANNER_IP, SCANNER_PORT, SLOW_POLL_INTERVAL, HISTORY_SIZE,
+    attach_shared_memory, json_dumps, read_shared_json, shared_memory_live
+)
+
+# The scanner runs as a task on an event loop in a background thread, so the
+# HTTP handlers can serve its data straight from memory. It polls slowly in
+# the background and on demand whenever /api/data finds the data stale
+scanner = SDS200Scanner(SCANNER_IP, SCANNER_PORT)
+scanner_loop = asyncio.new_event_loop()
+# Fixed /api/start and /api/stop response bodies
+_RESP_STARTED = b'{"status":"started"}'
+_RESP_ALREADY_RUNNING = b'{"status":"already running"}'
+_RESP_STOPPED = b'{"status":"stopped"}'
+_RESP_COLLECTOR_RUNNING = b'{"status":"collector running"}'
+_RESP_NO_HISTORY = b'{"error":"history is only recorded by the in-process scanner"}'
+
+# Only touched from coroutines on scanner_loop, so starts and stops from
+# concurrent request threads are serialized by the loop itself
+scanner_task = None
+
+async def start_scan():
+    global scanner_task
+    if scanner_task is None or scanner_task.done():
+        scanner_task = asyncio.create_task(scanner.continuous_scan_async(SLOW_POLL_INTERVAL))
+        return True
+    return False
+
+async def stop_scan():
+    global scanner_task
+    if scanner_task is None:
+        return False
+    scanner_task.cancel()
+    await asyncio.gather(scanner_task, return_exceptions=True)
+    scanner_task = None
+    scanner.disconnect()
+    # Re-serialize so /api/data stops reporting the last poll as connected.
+    # Only in memory: the data file may belong to the standalone collector
+    scanner.update_cached_json()
+    return True
+
+# Compressed JSON bodies keyed by (encoding, payload), so clients fetching the
+# same data only pay for compressing it once
+COMPRESS_MIN_SIZE = 256
+COMPRESS_CACHE_SIZE = 32
+compressed_cache = {}
+
+def compress(payload, encoding):
+    key = (encoding, payload)
+    body = compressed_cache.get(key)
+    if body is None:
+        if encoding == 'br':
+            body = brotli.compress(payload, quality=4)
+        else:
+            body = gzip.compress(payload, compresslevel=6, mtime=0)
+        if len(compressed_cache) >= COMPRESS_CACHE_SIZE:
+            compressed_cache.clear()
+        compressed_cache[key] = body
+    return body
+
+def accepted_encodings(header):
+    encodings = set()
+    for part in header.split(','):
+        name, _, params = part.partition(';')
+        params = params.replace(' ', '')
+        if params.startswith('q='):
+            try:
+                if float(params[2:]) == 0:
+                    continue
+            except ValueError:
+                continue
+        if name.strip():
+            encodings.add(name.strip().lower())
+    return encodings
+
+# Shared memory published by a standalone sds200_scanner.py. While that
+# collector is running it owns the scanner connection: /api/data serves its
+# data, /api/start won't open a second connection, and /api/history (which
+# the collector doesn't publish) is unavailable
+collector_shm = None
+
+def get_collector_shm():
+    global collector_shm
+    if collector_shm is None:
+        collector_shm = attach_shared_memory()
+    return collector_shm
+
+def collector_running():
+    shm = get_collector_shm()
+    return shm is not None and shared_memory_live(shm)
+
+def read_collector_data():
+    shm = get_collector_shm()
+    if shm is None:
+        return None
+    return read_shared_json(shm)
 
 class DashboardHandler(SimpleHTTPRequestHandler):
+    _etag = None
+    
     def do_GET(self):
         if self.path == '/':
             self.path = '/index.html'
+        elif self.path == '/api/data':
+            return self.send_data()
+        elif self.path.startswith('/api/history'):
+            return self.send_history()
         return SimpleHTTPRequestHandler.do_GET(self)
     
+    def send_head(self):
+        # Let browsers revalidate static files with If-None-Match instead of re-downloading them
+        try:
+            st = os.stat(self.translate_path(self.path))
+        except OSError:
+            return SimpleHTTPRequestHandler.send_head(self)
+        if not stat.S_ISREG(st.st_mode):
+            return SimpleHTTPRequestHandler.send_head(self)
+        
+        etag = f'"{st.st_mtime_ns:x}-{st.st_size:x}"'
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return None
+        self._etag = etag
+        return SimpleHTTPRequestHandler.send_head(self)
+    
+    def end_headers(self):
+        if self._etag is not None:
+            self.send_header('ETag', self._etag)
+            self._etag = None
+        SimpleHTTPRequestHandler.end_headers(self)
+    
+    def copyfile(self, source, outputfile):
+        # sendfile(2) copies the file to the socket inside the kernel
+        outputfile.flush()
+        self.request.sendfile(source)
+    
     def do_POST(self):
+        # The API takes no request body; only drain one if a client sent it
         content_length = int(self.headers.get('Content-Length', 0))
-        self.rfile.read(content_length)
+        if content_length:
+            self.rfile.read(content_length)
         
         if self.path == '/api/start':
             self.start_scanner()
@@ -24,49 +164,103 @@ class DashboardHandler(SimpleHTTPRequestHandler):
             self.send_response(404)
             self.end_headers()
     
+    def send_data(self):
+        payload = None
+        if scanner_task is None:
+            payload = read_collector_data()
+        if payload is None:
+            payload = asyncio.run_coroutine_threadsafe(scanner.refresh(), scanner_loop).result()
+        if payload is None:
+            payload = json_dumps(scanner.get_data())
+        self.send_json(payload)
+    
+    def send_json(self, payload, status=200):
+        encoding = None
+        if len(payload) >= COMPRESS_MIN_SIZE:
+            accepted = accepted_encodings(self.headers.get('Accept-Encoding', ''))
+            if brotli is not None and 'br' in accepted:
+                encoding = 'br'
+            elif 'gzip' in accepted:
+                encoding = 'gzip'
+        if encoding is not None:
+            payload = compress(payload, encoding)
+        
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        if encoding is not None:
+            self.send_header('Content-Encoding', encoding)
+        self.send_header('Content-Length', str(len(payload)))
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Vary', 'Accept-Encoding')
+        self.end_headers()
+        self.wfile.write(payload)
+    
+    def send_history(self):
+        query = parse_qs(urlsplit(self.path).query)
+        try:
+            since = int(query.get('since', ['0'])[0])
+            downsample = int(query.get('downsample', ['0'])[0])
+            buckets = min(int(query.get('buckets', ['0'])[0]), HISTORY_SIZE)
+        except ValueError:
+            self.send_response(400)
+            self.end_headers()
+            return
+        if scanner_task is None and collector_running():
+            return self.send_json(_RESP_NO_HISTORY, status=503)
+        if buckets > 0:
+            body = scanner.bucket_history(buckets, since)
+        elif downsample > 0:
+            seq, means = scanner.downsample_history(downsample, since)
+            body = {"seq": seq, "downsample": downsample, "signal_strength": means}
+        else:
+            seq, samples = scanner.get_history(since)
+            body = {"seq": seq, "history": samples}
+        payload = json_dumps(body)
+        self.send_json(payload)
+    
     def start_scanner(self):
-        global scanner_process
         try:
-            if scanner_process is None or scanner_process.poll() is not None:
-                scanner_process = subprocess.Popen(
-                    ['python3', 'sds200_scanner.py'],
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.PIPE
-                )
+            if collector_running():
                 self.send_response(200)
                 self.send_header('Content-Type', 'application/json')
                 self.end_headers()
-                self.wfile.write(json.dumps({"status": "started"}).encode())
+                self.wfile.write(_RESP_COLLECTOR_RUNNING)
+            elif asyncio.run_coroutine_threadsafe(start_scan(), scanner_loop).result():
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.end_headers()
+                self.wfile.write(_RESP_STARTED)
             else:
                 self.send_response(200)
                 self.send_header('Content-Type', 'application/json')
                 self.end_headers()
-                self.wfile.write(json.dumps({"status": "already running"}).encode())
+                self.wfile.write(_RESP_ALREADY_RUNNING)
         except Exception as e:
             self.send_response(500)
             self.send_header('Content-Type', 'application/json')
             self.end_headers()
-            self.wfile.write(json.dumps({"error": str(e)}).encode())
+            self.wfile.write(json_dumps({"error": str(e)}))
     
     def stop_scanner(self):
-        global scanner_process
         try:
-            if scanner_process is not None:
-                scanner_process.terminate()
-                scanner_process.wait(timeout=5)
-                scanner_process = None
+            stopped = asyncio.run_coroutine_threadsafe(stop_scan(), scanner_loop).result()
             self.send_response(200)
             self.send_header('Content-Type', 'application/json')
             self.end_headers()
-            self.wfile.write(json.dumps({"status": "stopped"}).encode())
+            if not stopped and collector_running():
+                self.wfile.write(_RESP_COLLECTOR_RUNNING)
+            else:
+                self.wfile.write(_RESP_STOPPED)
         except Exception as e:
             self.send_response(500)
             self.send_header('Content-Type', 'application/json')
             self.end_headers()
-            self.wfile.write(json.dumps({"error": str(e)}).encode())
+            self.wfile.write(json_dumps({"error": str(e)}))
 
 if __name__ == '__main__':
     os.chdir(os.path.dirname(os.path.abspath(__file__)))
-    server = HTTPServer(('0.0.0.0', 8000), DashboardHandler)
+    threading.Thread(target=scanner_loop.run_forever, daemon=True).start()
+    server = ThreadingHTTPServer(('0.0.0.0', 8000), DashboardHandler)
+    server.daemon_threads = True
     print('Dashboard running on http://localhost:8000')
     server.serve_forever()
@@ -26,7 +26,7 @@ echo -e "${GREEN}Python backend PID: $PYTHON_PID${NC}"
 # Start simple HTTP server
 echo -e "${BLUE}Starting web server on http://localhost:8000${NC}"
 cd "$WEB_DIR"
-python3 -m http.server 8000 > /dev/null 2>&1 &
+python3 "$SCRIPT_DIR/server.py" > /dev/null 2>&1 &
 WEB_PID=$!
 echo -e "${GREEN}Web server PID: $WEB_PID${NC}"
 